@@ -0,0 +1,114 @@
+"""Compare the asyncio and uvloop event loops on the bot's message-dispatch path.
+
+Every message goes through the same path as a real MESSAGE_CREATE gateway event: it is parsed
+by the connection state, dispatched as `on_message`, resolved to the `,ping` prefix command and
+answered through `ctx.send`. Only the HTTP call is replaced, so no token or network is needed.
+
+Usage
+-----
+    poetry run python -m benchmarks.dispatch [--messages 20000] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections import abc
+from typing import Any
+
+import disnake
+from loguru import logger
+from tutorialbot.bot import TutorialBot
+from tutorialbot.bot.extensions.commands.prefix import PrefixCog
+
+CHANNEL_ID = 1_000
+AUTHOR = {"id": "2000", "username": "bench", "discriminator": "0", "avatar": None}
+BOT_USER = {"id": "3000", "username": "bot", "discriminator": "0", "avatar": None, "bot": True}
+
+
+def _message_payload(message_id: int, content: str) -> dict[str, Any]:
+    return {
+        "id": str(message_id),
+        "channel_id": str(CHANNEL_ID),
+        "author": AUTHOR,
+        "content": content,
+        "timestamp": "2024-01-01T00:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+async def _dispatch(messages: int) -> float:
+    bot = TutorialBot(
+        command_prefix=[","],
+        intents=disnake.Intents.default() | disnake.Intents.message_content,
+    )
+    bot.add_cog(PrefixCog(bot))
+    # messages arrive in a DM channel, which needs to know who the bot is
+    state = bot._connection
+    state.user = disnake.ClientUser(state=state, data=BOT_USER)  # type: ignore[arg-type]
+
+    done = asyncio.Event()
+    replies = 0
+
+    async def send_message(channel_id: int, content: str | None, **_: object) -> dict[str, Any]:
+        nonlocal replies
+        replies += 1
+        if replies == messages:
+            done.set()
+        return _message_payload(10_000_000 + replies, content or "")
+
+    bot.http.send_message = send_message  # type: ignore[method-assign]
+    payloads = [_message_payload(i, ",ping") for i in range(messages)]
+
+    start = time.perf_counter()
+    for payload in payloads:
+        state.parse_message_create(payload)  # type: ignore[arg-type]
+    await done.wait()
+    return time.perf_counter() - start
+
+
+def _loop_factories() -> dict[str, abc.Callable[[], asyncio.AbstractEventLoop]]:
+    factories: dict[str, abc.Callable[[], asyncio.AbstractEventLoop]] = {
+        "asyncio": asyncio.new_event_loop,
+    }
+    try:
+        import uvloop
+    except ImportError:
+        print("uvloop is not installed, install the `uvloop` extra to compare both loops")
+    else:
+        factories["uvloop"] = uvloop.new_event_loop
+    return factories
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    # the ping command logs every invocation, which would dominate the measurement
+    logger.remove()
+
+    for name, factory in _loop_factories().items():
+        timings: list[float] = []
+        for _ in range(args.rounds):
+            with asyncio.Runner(loop_factory=factory) as runner:
+                timings.append(runner.run(_dispatch(args.messages)))
+
+        best, median = min(timings), statistics.median(timings)
+        print(
+            f"{name:>8}: best {best * 1000:8.1f}ms, median {median * 1000:8.1f}ms"
+            f" -> {args.messages / best:10,.0f} msg/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import asyncio
+import time
+from collections import abc
+from typing import Any
+
+import aiohttp
+import pytest
+from aiohttp import web
+from tutorialbot.ext.oauth import OAuth2Client, OAuth2Error, OAuth2Token, OAuth2TokenManager
+
+
+class StubTokenServer:
+    """A local token endpoint whose responses are decided per test."""
+
+    def __init__(self, respond: abc.Callable[[dict[str, str]], web.Response]) -> None:
+        self.respond = respond
+        self.requests: list[dict[str, str]] = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        data = dict(await request.post())
+        self.requests.append(data)  # type: ignore[arg-type]
+        return self.respond(data)  # type: ignore[arg-type]
+
+
+def token_response(**extra: Any) -> web.Response:
+    return web.json_response({"access_token": "fresh", "token_type": "Bearer", **extra})
+
+
+def run_against_stub(
+    respond: abc.Callable[[dict[str, str]], web.Response],
+    scenario: abc.Callable[[OAuth2TokenManager, StubTokenServer], abc.Awaitable[None]],
+) -> None:
+    async def main() -> None:
+        server = StubTokenServer(respond)
+        app = web.Application()
+        app.router.add_post("/token", server.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+
+        try:
+            async with aiohttp.ClientSession() as session:
+                client = OAuth2Client(
+                    session,
+                    client_id="id",
+                    secret="secret",
+                    redirect_uri="http://localhost/callback",
+                    token_url=f"http://127.0.0.1:{port}/token",
+                )
+                await scenario(OAuth2TokenManager(client, refresh_margin=60), server)
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
+
+
+def expiring_token(seconds: float, refresh_token: str | None = "refresh") -> OAuth2Token:
+    return OAuth2Token(
+        access_token="old",
+        token_type="Bearer",
+        expires_at=time.time() + seconds,
+        scope="identify",
+        refresh_token=refresh_token,
+    )
+
+
+def test_concurrent_callers_share_one_request() -> None:
+    async def scenario(manager: OAuth2TokenManager, server: StubTokenServer) -> None:
+        tokens = await asyncio.gather(*(manager.get_client_token("a b") for _ in range(20)))
+        assert {token.access_token for token in tokens} == {"fresh"}
+        assert len(server.requests) == 1
+
+    run_against_stub(lambda _: token_response(expires_in=600, scope="b a"), scenario)
+
+
+@pytest.mark.parametrize("expires_in", [30, -1])
+def test_revoked_refresh_token_is_dropped(expires_in: float) -> None:
+    async def scenario(manager: OAuth2TokenManager, server: StubTokenServer) -> None:
+        manager._tokens[(1, "identify")] = expiring_token(expires_in)
+
+        for _ in range(5):
+            with pytest.raises(OAuth2Error):
+                await manager.get_user_token(1, "identify")
+
+        assert len(server.requests) == 1
+        assert (1, "identify") not in manager._tokens
+
+    run_against_stub(
+        lambda _: web.json_response({"error": "invalid_grant"}, status=400), scenario
+    )
+
+
+def test_transient_failure_backs_off_and_serves_current_token() -> None:
+    async def scenario(manager: OAuth2TokenManager, server: StubTokenServer) -> None:
+        manager._tokens[(1, "identify")] = expiring_token(30)
+
+        for _ in range(20):
+            token = await manager.get_user_token(1, "identify")
+            assert token.access_token == "old"
+
+        assert len(server.requests) == 1
+
+    run_against_stub(lambda _: web.json_response({}, status=503), scenario)
+
+
+def test_authorize_falls_back_to_requested_scopes() -> None:
+    async def scenario(manager: OAuth2TokenManager, server: StubTokenServer) -> None:
+        # RFC 6749 lets the endpoint omit `scope` when it granted what was requested
+        await manager.authorize(1, "code", scopes=["identify", "guilds"])
+
+        token = await manager.get_user_token(1, "guilds identify")
+        assert token.access_token == "fresh"
+        assert token.scope == "guilds identify"
+        assert len(server.requests) == 1
+
+    run_against_stub(lambda _: token_response(expires_in=600, refresh_token="r"), scenario)
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+from tutorialbot.ext.profiler import ProfileReport, profile
+
+STALL = 0.3
+
+
+def spin(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def stall() -> None:
+    spin(STALL / 2)
+    sum(range(10))
+    spin(STALL / 2)
+
+
+async def chatty() -> None:
+    while True:
+        spin(0.03)
+        await asyncio.sleep(0)
+
+
+def test_task_steps_are_separate_runs() -> None:
+    async def main() -> ProfileReport:
+        task = asyncio.create_task(chatty(), name="chatty")
+        report = await profile(1.0, slow_threshold=0.1)
+        task.cancel()
+        return report
+
+    report = asyncio.run(main())
+
+    # back to back 30ms steps of one task, none of them is slow on its own
+    assert report.busy_samples
+    assert not report.slow_callbacks
+
+
+def test_slow_callback_is_one_run_named_after_the_callback() -> None:
+    async def main() -> ProfileReport:
+        asyncio.get_running_loop().call_later(0.1, stall)
+        return await profile(0.6, slow_threshold=0.1)
+
+    report = asyncio.run(main())
+
+    assert [run.name for run in report.slow_callbacks] == ["test_profiler.py:stall"]
+    assert report.slow_callbacks[0].duration >= STALL * 0.75
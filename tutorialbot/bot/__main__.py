@@ -8,6 +8,7 @@ from loguru import logger
 from tutorialbot.bot import TutorialBot, __author__, __version__
 from tutorialbot.core import logging, settings
 from tutorialbot.ext.http import HttpClient
+from tutorialbot.ext.profiler import dump_profile
 
 
 async def main() -> None:
@@ -33,6 +34,7 @@ async def main() -> None:
     8. Define and register a signal handler (`_signal_handler`) for SIGINT, SIGTERM 
         (and SIGBREAK on Windows)
         that will log a shutdown message, schedule the bot to close, and set the shutdown event.
+        On platforms that support it, SIGUSR1 starts a profiling run of the event loop.
     9. Start the bot login task inside an asyncio.TaskGroup to authenticate with Discord.
     10. Create HTTP client sessions (regular and authenticated) and then create a TaskGroup to run 
         the bot connection concurrently. This ensures that HTTP routes and the bot connection 
@@ -41,6 +43,7 @@ async def main() -> None:
     logging.setup()
     logger.info(f"Running tutorialbot v{__version__} ({settings.bot.env})")
     logger.info(f"By {__author__}")
+    logger.info(f"Event loop: {type(asyncio.get_running_loop()).__module__}")
 
     if settings.bot.env == "DEV":
         activity = disnake.Game(name="[DEV] Bot in development...")
@@ -87,6 +90,20 @@ async def main() -> None:
             # fallback to the standard signal.signal registration.
             signal.signal(signal_, _signal_handler)
 
+    def _profile_handler(*_: object) -> None:
+        """Signal handler that profiles the event loop and writes the stacks to disk."""
+        bot.loop.create_task(
+            dump_profile(
+                float(settings.profiler.signal_seconds),
+                settings.profiler.output_dir,
+                interval=float(settings.profiler.interval),
+                slow_threshold=float(settings.profiler.slow_threshold),
+            )
+        )
+
+    if sys.platform != "win32":
+        bot.loop.add_signal_handler(signal.SIGUSR1, _profile_handler)
+
     # first, log in without actually connecting so that token validation happens early.
     async with asyncio.TaskGroup() as tg:
         tg.create_task(bot.login(settings.bot.token))
@@ -100,5 +117,24 @@ async def main() -> None:
         tg.create_task(bot.connect())
 
 
+def run() -> None:
+    """Run `main` on the event loop selected by `settings.runtime.loop`.
+
+    "uvloop" is opt-in and falls back to the default asyncio loop when uvloop is not
+    installed or the platform is Windows.
+    """
+    loop_factory = None
+    if settings.runtime.loop == "uvloop":
+        try:
+            import uvloop
+        except ImportError:
+            logger.warning("uvloop is not installed, falling back to the asyncio event loop")
+        else:
+            loop_factory = uvloop.new_event_loop
+
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(main())
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    run()
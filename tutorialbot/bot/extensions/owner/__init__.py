@@ -0,0 +1,15 @@
+from disnake.ext import commands
+from loguru import logger
+from tutorialbot.bot.extensions.owner.profiler import ProfilerCog
+
+
+def setup(bot: commands.Bot) -> None:
+    """Entry point for adding this Cog to the bot.
+
+    Args
+    ----
+        bot (commands.Bot):
+            The bot instance to which the ProfilerCog will be added.
+    """
+    bot.add_cog(ProfilerCog(bot))
+    logger.info("ProfilerCog has been succesfully initiated")
@@ -0,0 +1,52 @@
+import io
+
+import disnake
+from disnake.ext import commands
+from loguru import logger
+from tutorialbot.bot import TutorialBot
+from tutorialbot.core import settings
+from tutorialbot.ext.profiler import profile
+
+MAX_PROFILE_SECONDS = 120
+
+
+class ProfilerCog(commands.Cog):
+    """A Cog that lets the bot owner profile the running event loop.
+
+    Provides an owner-only command ',profile' that samples the loop for a few seconds and
+    replies with a summary and the collapsed stacks, ready to be turned into a flamegraph.
+    """
+
+    def __init__(self, bot: commands.Bot) -> None:
+        """Initialize the ProfilerCog.
+
+        Args
+        ----
+            bot (commands.Bot):
+                The bot instance that this cog is attached to.
+        """
+        self.bot = bot
+
+    @commands.command(
+        name="profile",
+        help="Samples the event loop for the given number of seconds"
+    )
+    @commands.is_owner()
+    async def profile(self, ctx: commands.Context[TutorialBot], seconds: float = 10) -> None:
+        """Profile the event loop and send back the summary and collapsed stacks."""
+        seconds = min(max(seconds, 1), MAX_PROFILE_SECONDS)
+        await ctx.send(f"Profiling the event loop for {seconds:g}s…")
+        logger.info(f"Profiling event loop for {seconds}s, requested by {ctx.author}")
+
+        try:
+            report = await profile(
+                seconds,
+                interval=float(settings.profiler.interval),
+                slow_threshold=float(settings.profiler.slow_threshold),
+            )
+        except RuntimeError as err:
+            await ctx.send(str(err))
+            return
+
+        stacks = disnake.File(io.BytesIO(report.collapsed().encode()), filename="profile.folded")
+        await ctx.send(f"```\n{report.summary()}\n```", file=stacks)
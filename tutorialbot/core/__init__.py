@@ -21,6 +21,24 @@ if TYPE_CHECKING:
         level: str
         open_telemetry_endpoint: str
 
+    @dataclass
+    class _OAuthGroup:
+        token_url: str
+        refresh_margin: float
+        cache_path: str
+        cache_key: str
+
+    @dataclass
+    class _RuntimeGroup:
+        loop: str
+
+    @dataclass
+    class _ProfilerGroup:
+        interval: float
+        slow_threshold: float
+        signal_seconds: float
+        output_dir: str
+
     class _EmojiGroup(abc.Mapping[str, str]):
         def __getattr__(self, name: str) -> str: ...
 
@@ -31,6 +49,9 @@ if TYPE_CHECKING:
     class Settings:
         bot: _BotGroup
         log: _LogGroup
+        oauth: _OAuthGroup
+        runtime: _RuntimeGroup
+        profiler: _ProfilerGroup
 
         emojis: _EmojiGroup
         colors: _ColorGroup
@@ -47,6 +68,8 @@ settings = cast(
         settings_files=[
             "assets/settings/colors.toml",
             "assets/settings/emojis.toml",
+            "assets/settings/oauth.toml",
+            "assets/settings/runtime.toml",
         ],
     ),
 )
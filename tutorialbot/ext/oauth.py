@@ -0,0 +1,491 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+from collections import abc
+from dataclasses import asdict, dataclass, replace
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, cast
+
+import aiohttp
+from loguru import logger
+
+DISCORD_TOKEN_URL = "https://discord.com/api/oauth2/token"
+
+# (user id or None for the application itself, normalized scope string)
+TokenKey = tuple[int | None, str]
+
+# statuses with which the token endpoint rejects a grant for good, e.g. a revoked refresh token
+_REJECTED_STATUSES = frozenset({HTTPStatus.BAD_REQUEST, HTTPStatus.UNAUTHORIZED})
+
+
+class OAuth2Error(Exception):
+    """Raised when the token endpoint rejects a request or no usable token is available."""
+
+    def __init__(
+        self, message: str, *, status: int | None = None, error: str | None = None
+    ) -> None:
+        super().__init__(message)
+        self.status = status
+        self.error = error
+
+
+def normalize_scope(scopes: str | abc.Iterable[str]) -> str:
+    """Return a canonical, space separated representation of the given scopes.
+
+    Args
+    ----
+        scopes (str | Iterable[str]):
+            Either a space separated scope string or an iterable of scopes.
+
+    Returns
+    -------
+        str:
+            The unique scopes sorted alphabetically and joined by a single space.
+    """
+    if isinstance(scopes, str):
+        scopes = scopes.split()
+    return " ".join(sorted(set(scopes)))
+
+
+@dataclass(frozen=True, slots=True)
+class OAuth2Token:
+    """An access token issued by the token endpoint.
+
+    `expires_at` is a unix timestamp so that tokens survive being persisted across restarts.
+    """
+
+    access_token: str
+    token_type: str
+    expires_at: float
+    scope: str
+    refresh_token: str | None = None
+
+    @classmethod
+    def from_response(cls, data: abc.Mapping[str, Any], *, now: float | None = None) -> OAuth2Token:
+        """Build a token from a token endpoint JSON response.
+
+        Args
+        ----
+            data (Mapping[str, Any]):
+                The decoded JSON body returned by the token endpoint.
+            now (float | None, optional):
+                The unix time the response was received at. Defaults to the current time.
+
+        Returns
+        -------
+            OAuth2Token:
+                The parsed token.
+        """
+        issued_at = time.time() if now is None else now
+        return cls(
+            access_token=data["access_token"],
+            token_type=data.get("token_type", "Bearer"),
+            expires_at=issued_at + float(data.get("expires_in", 0)),
+            scope=normalize_scope(data.get("scope", "")),
+            refresh_token=data.get("refresh_token"),
+        )
+
+    def expires_within(self, seconds: float, *, now: float | None = None) -> bool:
+        """Return whether the token expires within the given number of seconds."""
+        return self.expires_at - (time.time() if now is None else now) <= seconds
+
+    @property
+    def authorization(self) -> str:
+        """The value to send in an `Authorization` header."""
+        return f"{self.token_type} {self.access_token}"
+
+
+class OAuth2Client:
+    """Performs the raw OAuth2 grant requests against a token endpoint.
+
+    The client credentials are sent with basic authentication, the same way
+    `HttpClient.create_auth_session` authenticates, so the auth session can be passed in directly.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        *,
+        client_id: str,
+        secret: str,
+        redirect_uri: str | None = None,
+        token_url: str = DISCORD_TOKEN_URL,
+    ) -> None:
+        """Initialize the OAuth2Client.
+
+        Args
+        ----
+            session (aiohttp.ClientSession):
+                The session used to talk to the token endpoint.
+            client_id (str):
+                The application's client id.
+            secret (str):
+                The application's client secret.
+            redirect_uri (str | None, optional):
+                The redirect uri registered for the authorization code flow.
+            token_url (str, optional):
+                The token endpoint. Defaults to Discord's, override it to point at a stub server.
+        """
+        self.session = session
+        self.redirect_uri = redirect_uri
+        self.token_url = token_url
+        self._auth = aiohttp.BasicAuth(client_id, secret)
+
+    async def client_credentials(self, scopes: str | abc.Iterable[str]) -> OAuth2Token:
+        """Request an application token through the client credentials grant."""
+        return await self._request({
+            "grant_type": "client_credentials",
+            "scope": normalize_scope(scopes),
+        })
+
+    async def exchange_code(self, code: str, *, redirect_uri: str | None = None) -> OAuth2Token:
+        """Exchange an authorization code for a user token.
+
+        Args
+        ----
+            code (str):
+                The code received on the redirect uri.
+            redirect_uri (str | None, optional):
+                Overrides the redirect uri given to the constructor.
+
+        Raises
+        ------
+            OAuth2Error:
+                If no redirect uri is configured or the endpoint rejects the code.
+        """
+        redirect_uri = redirect_uri or self.redirect_uri
+        if not redirect_uri:
+            raise OAuth2Error("A redirect uri is required for the authorization code grant")
+
+        return await self._request({
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": redirect_uri,
+        })
+
+    async def refresh(self, refresh_token: str) -> OAuth2Token:
+        """Exchange a refresh token for a new access token."""
+        return await self._request({"grant_type": "refresh_token", "refresh_token": refresh_token})
+
+    async def _request(self, data: dict[str, str]) -> OAuth2Token:
+        async with self.session.post(self.token_url, data=data, auth=self._auth) as response:
+            try:
+                decoded = await response.json(content_type=None)
+            except (json.JSONDecodeError, aiohttp.ContentTypeError):
+                decoded = None
+            body = cast(dict[str, Any], decoded) if isinstance(decoded, dict) else {}
+
+            if not response.ok or "access_token" not in body:
+                error: str | None = body.get("error")
+                raise OAuth2Error(
+                    f"Token endpoint returned {response.status} for {data['grant_type']}: {error}",
+                    status=response.status,
+                    error=error,
+                )
+
+            return OAuth2Token.from_response(body)
+
+
+class EncryptedTokenStore:
+    """Persists cached tokens to a file encrypted with Fernet.
+
+    Requires the optional `cryptography` dependency (`poetry install -E crypto`).
+    """
+
+    def __init__(self, path: str | Path, key: str | bytes) -> None:
+        """Initialize the EncryptedTokenStore.
+
+        Args
+        ----
+            path (str | Path):
+                The file the encrypted tokens are written to.
+            key (str | bytes):
+                A url-safe base64 encoded 32 byte key, see `Fernet.generate_key`.
+
+        Raises
+        ------
+            RuntimeError:
+                If `cryptography` is not installed.
+        """
+        try:
+            from cryptography.fernet import Fernet
+        except ImportError as err:
+            raise RuntimeError(
+                "Encrypted token persistence requires the `cryptography` package"
+            ) from err
+
+        self.path = Path(path)
+        self._fernet = Fernet(key)
+
+    async def load(self) -> dict[TokenKey, OAuth2Token]:
+        """Read and decrypt the stored tokens, returning an empty mapping if unavailable."""
+        return await asyncio.to_thread(self._load)
+
+    async def save(self, tokens: abc.Mapping[TokenKey, OAuth2Token]) -> None:
+        """Encrypt and atomically write the given tokens."""
+        payload = [
+            {"user": user, "scope": scope, "token": asdict(token)}
+            for (user, scope), token in tokens.items()
+        ]
+        await asyncio.to_thread(self._write, self._fernet.encrypt(json.dumps(payload).encode()))
+
+    def _load(self) -> dict[TokenKey, OAuth2Token]:
+        from cryptography.fernet import InvalidToken
+
+        if not self.path.exists():
+            return {}
+
+        try:
+            raw = self._fernet.decrypt(self.path.read_bytes())
+        except InvalidToken:
+            logger.warning(f"Could not decrypt OAuth2 token cache at {self.path}, ignoring it")
+            return {}
+
+        return {
+            (entry["user"], entry["scope"]): OAuth2Token(**entry["token"])
+            for entry in json.loads(raw)
+        }
+
+    def _write(self, data: bytes) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # a unique temp file per save, so concurrent writers never replace each other's file
+        fd, name = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.")
+        tmp = Path(name)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            tmp.replace(self.path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+
+class OAuth2TokenManager:
+    """Caches OAuth2 tokens in memory and refreshes them ahead of their expiry.
+
+    Tokens are keyed by user (None for the application's own client credentials token) and
+    normalized scope. Concurrent callers asking for the same key share a single in-flight
+    request, so the token endpoint is hit at most once per key at a time.
+    """
+
+    def __init__(
+        self,
+        client: OAuth2Client,
+        *,
+        refresh_margin: float = 60.0,
+        retry_delay: float = 15.0,
+        store: EncryptedTokenStore | None = None,
+    ) -> None:
+        """Initialize the OAuth2TokenManager.
+
+        Args
+        ----
+            client (OAuth2Client):
+                The client used to obtain new tokens.
+            refresh_margin (float, optional):
+                Seconds before expiry at which a cached token is refreshed. Defaults to 60.
+            retry_delay (float, optional):
+                Seconds to wait before calling the token endpoint again for a key after it
+                failed with a transient error. Defaults to 15.
+            store (EncryptedTokenStore | None, optional):
+                Where to persist tokens. Tokens are kept in memory only when omitted.
+        """
+        self.client = client
+        self.refresh_margin = refresh_margin
+        self.retry_delay = retry_delay
+        self.store = store
+        self._tokens: dict[TokenKey, OAuth2Token] = {}
+        self._inflight: dict[TokenKey, asyncio.Task[OAuth2Token]] = {}
+        self._retry_after: dict[TokenKey, float] = {}
+        self._persist_lock = asyncio.Lock()
+
+    @classmethod
+    def from_settings(cls, session: aiohttp.ClientSession) -> OAuth2TokenManager:
+        """Create a manager configured from `settings.bot` and `settings.oauth`.
+
+        Args
+        ----
+            session (aiohttp.ClientSession):
+                The session used to talk to the token endpoint.
+
+        Returns
+        -------
+            OAuth2TokenManager:
+                The configured manager, with persistence enabled when a cache path is set.
+
+        Raises
+        ------
+            RuntimeError:
+                If a cache path is configured without a cache key.
+        """
+        from tutorialbot.core import settings
+
+        if settings.oauth.cache_path and not settings.oauth.cache_key:
+            raise RuntimeError(
+                "TUTORIALBOT_OAUTH__CACHE_KEY must be set when TUTORIALBOT_OAUTH__CACHE_PATH is, "
+                "generate one with `cryptography.fernet.Fernet.generate_key()`"
+            )
+
+        client = OAuth2Client(
+            session,
+            client_id=str(settings.bot.client_id),
+            secret=settings.bot.secret,
+            redirect_uri=settings.bot.redirect_uri or None,
+            token_url=settings.oauth.token_url,
+        )
+        store = None
+        if settings.oauth.cache_path:
+            store = EncryptedTokenStore(settings.oauth.cache_path, settings.oauth.cache_key)
+
+        return cls(client, refresh_margin=float(settings.oauth.refresh_margin), store=store)
+
+    async def load(self) -> None:
+        """Populate the cache from the persistent store, if one is configured."""
+        if self.store is not None:
+            self._tokens.update(await self.store.load())
+            logger.info(f"Loaded {len(self._tokens)} OAuth2 token(s) from {self.store.path}")
+
+    async def get_client_token(self, scopes: str | abc.Iterable[str]) -> OAuth2Token:
+        """Return a valid application token for the scopes, requesting one if needed."""
+        scope = normalize_scope(scopes)
+        return await self._get((None, scope), lambda _: self.client.client_credentials(scope))
+
+    async def get_user_token(self, user_id: int, scopes: str | abc.Iterable[str]) -> OAuth2Token:
+        """Return a valid token previously authorized by a user, refreshing it if needed.
+
+        Raises
+        ------
+            OAuth2Error:
+                If the user never authorized these scopes or the token can no longer be refreshed.
+        """
+        key = (user_id, normalize_scope(scopes))
+        if key not in self._tokens:
+            raise OAuth2Error(f"No token cached for user {user_id} with scope '{key[1]}'")
+
+        return await self._get(key, self._refresh_user_token)
+
+    async def authorize(
+        self,
+        user_id: int,
+        code: str,
+        *,
+        scopes: str | abc.Iterable[str] | None = None,
+        redirect_uri: str | None = None,
+    ) -> OAuth2Token:
+        """Exchange an authorization code and cache the resulting token for the user.
+
+        Args
+        ----
+            user_id (int):
+                The user who authorized the application.
+            code (str):
+                The code received on the redirect uri.
+            scopes (str | Iterable[str] | None, optional):
+                The scopes that were requested. The endpoint may leave `scope` out of its
+                response when it granted exactly these, in which case they are used instead.
+            redirect_uri (str | None, optional):
+                Overrides the client's redirect uri.
+        """
+        token = await self.client.exchange_code(code, redirect_uri=redirect_uri)
+        if not token.scope and scopes is not None:
+            token = replace(token, scope=normalize_scope(scopes))
+
+        await self._store((user_id, token.scope), token)
+        return token
+
+    async def invalidate(self, user_id: int | None, scopes: str | abc.Iterable[str]) -> None:
+        """Drop a cached token, e.g. after the API rejected it."""
+        if self._tokens.pop((user_id, normalize_scope(scopes)), None) is not None:
+            await self._persist()
+
+    async def _get(
+        self,
+        key: TokenKey,
+        fetch: abc.Callable[[OAuth2Token | None], abc.Awaitable[OAuth2Token]],
+    ) -> OAuth2Token:
+        token = self._tokens.get(key)
+        if token is not None and not token.expires_within(self.refresh_margin):
+            return token
+
+        if (retry_after := self._retry_after.get(key)) and time.monotonic() < retry_after:
+            # the endpoint failed recently, don't hit it again until the backoff is over
+            if token is not None and not token.expires_within(0):
+                return token
+            raise OAuth2Error(f"Token endpoint unavailable for {key}, backing off")
+
+        if (task := self._inflight.get(key)) is None:
+            task = asyncio.create_task(self._refresh(key, token, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # shield so that a cancelled caller doesn't cancel the refresh shared with others
+        return await asyncio.shield(task)
+
+    async def _refresh(
+        self,
+        key: TokenKey,
+        current: OAuth2Token | None,
+        fetch: abc.Callable[[OAuth2Token | None], abc.Awaitable[OAuth2Token]],
+    ) -> OAuth2Token:
+        try:
+            token = await fetch(current)
+        except OAuth2Error as err:
+            if err.status not in _REJECTED_STATUSES and err.error != "invalid_grant":
+                return self._backoff(key, current, err)
+
+            # the grant is dead, retrying would only be rejected again
+            logger.warning(f"OAuth2 grant for {key} was rejected, dropping it: {err}")
+            self._retry_after.pop(key, None)
+            if self._tokens.pop(key, None) is not None:
+                await self._persist()
+            raise
+        except (aiohttp.ClientError, TimeoutError) as err:
+            return self._backoff(key, current, err)
+
+        self._retry_after.pop(key, None)
+        await self._store(key, token)
+        return token
+
+    def _backoff(self, key: TokenKey, current: OAuth2Token | None, err: Exception) -> OAuth2Token:
+        self._retry_after[key] = time.monotonic() + self.retry_delay
+        # refreshing ahead of the deadline failed, the current token is still usable
+        if current is not None and not current.expires_within(0):
+            logger.warning(f"Early OAuth2 refresh for {key} failed, reusing token: {err}")
+            return current
+        raise err
+
+    async def _refresh_user_token(self, current: OAuth2Token | None) -> OAuth2Token:
+        if current is None or current.refresh_token is None:
+            if current is not None and not current.expires_within(0):
+                # nothing to refresh with, keep using the token until it expires
+                return current
+            raise OAuth2Error("Token expired and has no refresh token", error="invalid_grant")
+
+        token = await self.client.refresh(current.refresh_token)
+        # some providers only rotate the refresh token occasionally and may omit the scope
+        return replace(
+            token,
+            scope=token.scope or current.scope,
+            refresh_token=token.refresh_token or current.refresh_token,
+        )
+
+    async def _store(self, key: TokenKey, token: OAuth2Token) -> None:
+        self._tokens[key] = token
+        await self._persist()
+
+    async def _persist(self) -> None:
+        if self.store is None:
+            return
+
+        # saves for different keys can overlap, write them one at a time
+        async with self._persist_lock:
+            try:
+                await self.store.save(self._tokens)
+            except OSError as err:
+                # the token is cached in memory either way, persisting is best effort
+                logger.error(f"Failed to persist OAuth2 tokens to {self.store.path}: {err}")
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import FrameType
+
+from loguru import logger
+
+# innermost frames that mean the loop thread is waiting for I/O rather than running Python code
+_IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    # uvloop polls from C, so the innermost Python frame is whatever started the loop
+    ("runners.py", "run"),
+    ("base_events.py", "run_until_complete"),
+}
+_ASYNCIO_DIR = str(Path(asyncio.__file__).parent)
+
+
+@dataclass(slots=True)
+class SlowCallback:
+    """A busy run: consecutive busy samples attributed to the same loop callback.
+
+    With the default loop every task step is its own run. uvloop runs callbacks from C, so
+    consecutive steps of the same task can't be told apart there and may merge into one run.
+    """
+
+    name: str
+    duration: float
+    stack: str
+
+
+@dataclass(slots=True)
+class ProfileReport:
+    """The result of a sampling run over the event loop thread."""
+
+    duration: float
+    interval: float
+    samples: int = 0
+    busy_samples: int = 0
+    stacks: Counter[str] = field(default_factory=Counter)
+    slow_callbacks: list[SlowCallback] = field(default_factory=list)
+
+    def collapsed(self) -> str:
+        """Return the busy stacks in collapsed format, as consumed by flamegraph.pl/speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, limit: int = 5) -> str:
+        """Return a short human readable summary of the run.
+
+        Args
+        ----
+            limit (int, optional):
+                How many busy runs to include. Defaults to 5.
+
+        Returns
+        -------
+            str:
+                The loop utilisation followed by the longest busy runs.
+        """
+        busy = self.busy_samples / self.samples if self.samples else 0.0
+        lines = [
+            (
+                f"{self.samples} samples over {self.duration:.1f}s "
+                f"every {self.interval * 1000:.1f}ms, loop busy {busy:.1%}"
+            ),
+        ]
+        slowest = sorted(self.slow_callbacks, key=lambda cb: cb.duration, reverse=True)[:limit]
+        lines.extend(
+            f"{cb.duration * 1000:.0f}ms busy run in {cb.name} at {cb.stack.rsplit(';', 1)[-1]}"
+            for cb in slowest
+        )
+        return "\n".join(lines)
+
+
+class SamplingProfiler:
+    """Samples the stack of the thread running an event loop from a background thread.
+
+    Only busy samples (the loop is executing Python code instead of polling) are recorded,
+    so the collapsed stacks show what is keeping the loop from serving other events.
+    Consecutive busy samples belonging to the same callback invocation (a task step or a plain
+    callback) are merged into a busy run, and runs longer than `slow_threshold` are reported
+    per task or callback, much like asyncio's debug mode reports slow callbacks.
+
+    The profiled code is never instrumented, the overhead is one stack walk per interval on
+    the sampling thread, which makes it cheap enough to run in production.
+    """
+
+    _active: bool = False
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        *,
+        interval: float = 0.005,
+        slow_threshold: float = 0.1,
+    ) -> None:
+        """Initialize the SamplingProfiler.
+
+        Args
+        ----
+            loop (asyncio.AbstractEventLoop):
+                The loop to profile. Must be running in the calling thread.
+            interval (float, optional):
+                Seconds between samples. Defaults to 5ms.
+            slow_threshold (float, optional):
+                Minimum duration in seconds for a run to be reported as slow. Defaults to 100ms.
+        """
+        self.loop = loop
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+
+    async def run(self, seconds: float) -> ProfileReport:
+        """Sample the loop for the given number of seconds.
+
+        Raises
+        ------
+            RuntimeError:
+                If another profiling run is already in progress.
+        """
+        if SamplingProfiler._active:
+            raise RuntimeError("A profiling run is already in progress")
+
+        SamplingProfiler._active = True
+        report = ProfileReport(duration=seconds, interval=self.interval)
+        sampler = threading.Thread(
+            target=self._sample, args=(report,), name="loop-profiler", daemon=True
+        )
+        try:
+            sampler.start()
+            await asyncio.sleep(seconds)
+        finally:
+            self._stop.set()
+            await asyncio.to_thread(sampler.join)
+            SamplingProfiler._active = False
+
+        return report
+
+    def _sample(self, report: ProfileReport) -> None:
+        current: tuple[object, FrameType | None, str] | None = None
+        started = last_seen = 0.0
+        stacks: Counter[str] = Counter()
+
+        def flush() -> None:
+            if current is not None and last_seen - started + self.interval >= self.slow_threshold:
+                report.slow_callbacks.append(
+                    SlowCallback(
+                        name=current[2],
+                        duration=last_seen - started + self.interval,
+                        stack=stacks.most_common(1)[0][0],
+                    )
+                )
+
+        while not self._stop.wait(self.interval):
+            # the only way to read another thread's stack from Python, private but documented
+            thread_frames = sys._current_frames()  # pyright: ignore[reportPrivateUsage]
+            frame = thread_frames.get(self._thread_id)
+            now = time.perf_counter()
+            report.samples += 1
+
+            if frame is None or _is_idle(frame):
+                flush()
+                current = None
+                continue
+
+            frames = _walk(frame)
+            stack = ";".join(map(_frame_label, frames))
+            report.busy_samples += 1
+            report.stacks[stack] += 1
+
+            # reading the current task from another thread is a plain dict lookup
+            task = asyncio.current_task(self.loop)
+            index = _callback_index(frames)
+            # the loop frame that invoked the callback, e.g. `Handle._run`, is a new frame object
+            # for every invocation, so holding on to it tells consecutive task steps apart
+            step = frames[index - 1] if index else None
+            if task is not None:
+                owner = (task, step, _task_name(task))
+            else:
+                # a plain callback (call_soon/call_later, protocol methods), keyed on its frame
+                # so that every sample of one invocation merges regardless of the helper it is in
+                callback = frames[index]
+                owner = (callback, step, _frame_label(callback))
+
+            if current != owner:
+                flush()
+                current, started = owner, now
+                stacks = Counter()
+
+            stacks[stack] += 1
+            last_seen = now
+
+        flush()
+
+
+async def profile(
+    seconds: float, *, interval: float = 0.005, slow_threshold: float = 0.1
+) -> ProfileReport:
+    """Profile the running event loop for the given number of seconds.
+
+    Args
+    ----
+        seconds (float):
+            How long to sample for.
+        interval (float, optional):
+            Seconds between samples. Defaults to 5ms.
+        slow_threshold (float, optional):
+            Minimum duration in seconds for a run to be reported as slow. Defaults to 100ms.
+
+    Returns
+    -------
+        ProfileReport:
+            The collected stacks and busy runs.
+    """
+    profiler = SamplingProfiler(
+        asyncio.get_running_loop(), interval=interval, slow_threshold=slow_threshold
+    )
+    return await profiler.run(seconds)
+
+
+async def dump_profile(
+    seconds: float,
+    output_dir: str | Path,
+    *,
+    interval: float = 0.005,
+    slow_threshold: float = 0.1,
+) -> Path | None:
+    """Profile the running loop and write the collapsed stacks to `output_dir`.
+
+    Used by the signal trigger, where there is nobody to hand the report to. Errors are logged
+    instead of raised so a failed run never takes the bot down.
+
+    Returns
+    -------
+        Path | None:
+            The written `.folded` file, or None if profiling failed.
+    """
+    logger.info(f"Profiling event loop for {seconds}s")
+    try:
+        report = await profile(seconds, interval=interval, slow_threshold=slow_threshold)
+    except RuntimeError as err:
+        logger.warning(f"Not profiling: {err}")
+        return None
+
+    path = Path(output_dir) / f"profile-{time.strftime('%Y%m%d-%H%M%S')}.folded"
+    try:
+        await asyncio.to_thread(_write, path, report.collapsed())
+    except OSError as err:
+        logger.error(f"Failed to write profile to {path}: {err}\n{report.summary()}")
+        return None
+
+    logger.info(f"Profile written to {path}\n{report.summary()}")
+    return path
+
+
+def _write(path: Path, data: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(data, encoding="utf-8")
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{code.co_qualname}"
+
+
+def _is_idle(frame: FrameType) -> bool:
+    return (Path(frame.f_code.co_filename).name, frame.f_code.co_name) in _IDLE_FRAMES
+
+
+def _walk(frame: FrameType) -> list[FrameType]:
+    """Return the frames of a stack from the outermost to the innermost one."""
+    frames: list[FrameType] = []
+    current: FrameType | None = frame
+    while current is not None:
+        frames.append(current)
+        current = current.f_back
+    frames.reverse()
+    return frames
+
+
+def _callback_index(frames: list[FrameType]) -> int:
+    """Return the index of the frame the loop called into, the first past the asyncio machinery.
+
+    With the default loop that is the frame under `Handle._run`, with uvloop, which runs
+    callbacks from C, it is the frame right under `Runner.run`.
+    """
+    in_loop = False
+    for index, frame in enumerate(frames):
+        if frame.f_code.co_filename.startswith(_ASYNCIO_DIR):
+            in_loop = True
+        elif in_loop:
+            return index
+    return len(frames) - 1
+
+
+def _task_name(task: asyncio.Task[object]) -> str:
+    coro = task.get_coro()
+    return f"{task.get_name()} ({getattr(coro, '__qualname__', repr(coro))})"